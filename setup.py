@@ -5,7 +5,8 @@ with open("README.md", "r") as fh:
 
 try:
     with open("./requirements.txt", "r") as fh:
-        requirements = fh.read().splitlines()
+        # Skip blank lines and comments so only real specifiers reach pip
+        requirements = [ln.strip() for ln in fh if ln.strip() and not ln.lstrip().startswith('#')]
 except FileNotFoundError:
     requirements = []
 
@@ -3,180 +3,475 @@ Arduino Control Module
 Provides classes and functions for controlling Arduino boards.
 """
 
-from pyfirmata import Arduino, util, OUTPUT, INPUT, PWM
+import functools
+import logging
+import operator
+
+logger = logging.getLogger(__name__)
+
+_DIGITAL_MESSAGE = 0x90  # Firmata digital I/O message, OR'd with the port number
 
 class SerialConnectionError(Exception):
     """Exception raised when there is an error connecting to the Arduino."""
     pass
 
+def _requires_board(default=None):
+    """Return ``default`` from the decorated method when no board is connected."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(self, *args, **kwargs):
+            if not self.board:
+                logger.error("Not connected to Arduino.")
+                return default
+            return fn(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
 class ArduinoIO:
-    def __init__(self, port, output_pins=None, safe_state=1):
+    # Fixed attribute layout: faster attribute access on the I/O hot paths
+    __slots__ = (
+        'port', 'board', '_iterator', 'safe_state', 'output_pins_configured',
+        '_pin_modes', '_digital_pins', '_analog_pins', '_analog_enabled',
+        '_last_digital', '_port_state', '_num_digital', '_closed', '_OUTPUT', '_INPUT', '_PWM',
+    )
+    
+    def __init__(self, port, output_pins=None, safe_state=1, low_latency=True, read_timeout=None):
+        """Connect to the board and drive ``output_pins`` to ``safe_state``.
+
+        ``low_latency`` requests the kernel's low-latency mode on the serial
+        port; the OS latency timer of USB serial adapters (FTDI and similar)
+        otherwise adds 15-50 ms to every round trip. ``read_timeout`` overrides
+        pyserial's read timeout and is left alone by default: pyfirmata opens
+        the port blocking and reads mid-message, so a short timeout can kill
+        the input iterator on a stalled frame.
+        """
+        # pyfirmata (and pyserial) are only loaded once a board is actually used
+        from pyfirmata import Arduino, util, OUTPUT, INPUT, PWM
+        self._OUTPUT = OUTPUT
+        self._INPUT = INPUT
+        self._PWM = PWM
+        
         self.port = port
         self.board = None
-        self.it = None
+        self._iterator = None
         self._pin_modes = {}
-        self.output_pins_configured = []
+        self._digital_pins = {}
+        self._analog_pins = {}
+        self._analog_enabled = set()
+        self._last_digital = {}
+        self._port_state = []  # Output bitmask per 8-pin port, sized on connect
+        self._num_digital = 0
+        self.output_pins_configured = set()
+        self._closed = False
         
         # Validate and set safe state
         if safe_state not in [0, 1]:
-            print("Warning: safe_state must be 0 (LOW) or 1 (HIGH). Defaulting to 1 (HIGH).")
+            logger.warning("safe_state must be 0 (LOW) or 1 (HIGH). Defaulting to 1 (HIGH).")
             safe_state = 1
         self.safe_state = safe_state
         
         try:
             # Connect to Arduino
             self.board = Arduino(self.port)
-            print(f"Connected to Arduino on {port}")
+            logger.info("Connected to Arduino on %s", port)
+            self._tune_serial(low_latency, read_timeout)
             
             # Start the Iterator thread for input
-            self.it = util.Iterator(self.board)
-            self.it.start()
+            self._iterator = util.Iterator(self.board)
+            self._iterator.start()
             self.board.pass_time(0.05)  # Give board time to initialize
             
+            self._num_digital = len(self.board.digital)
+            self._port_state = [0] * ((self._num_digital + 7) // 8)
+            
             # Configure output pins if specified
             if output_pins:
+                output_pins = list(output_pins)  # Accept any iterable; len() is needed below
                 for pin_num in output_pins:
+                    # Cheap range check up front; only the pin I/O needs a try
+                    index = self._pin_index(pin_num)
+                    if index is None:
+                        logger.warning("Invalid pin number %s for this board.", pin_num)
+                        continue
+                    pin_num = index  # Key caches by plain int, as later calls do
                     try:
-                        pin = self.board.digital[pin_num]
+                        pin = self._get_digital(pin_num)
                         if pin is not None:
                             pin.mode = OUTPUT
                             self._pin_modes[pin_num] = OUTPUT
                             pin.write(safe_state)
-                            self.output_pins_configured.append(pin_num)
-                            self.board.pass_time(0.01)
-                    except IndexError:
-                        print(f"Warning: Invalid pin number {pin_num} for this board.")
+                            self._record_digital(pin_num, safe_state)
+                            self.output_pins_configured.add(pin_num)
                     except Exception as e:
-                        print(f"Warning: Could not configure pin {pin_num}: {str(e)}")
+                        logger.warning("Could not configure pin %s: %s", pin_num, e)
+                # Single settle delay for the whole batch instead of one per pin
+                self.board.pass_time(max(0.02, 0.005 * len(output_pins)))
         except Exception as e:
-            print(f"ERROR: Failed to connect or initialize Arduino: {str(e)}")
-            print("Please ensure StandardFirmata is uploaded to your Arduino")
-            print("and you have specified the correct port.")
+            logger.error(
+                "Failed to connect or initialize Arduino: %s. Please ensure "
+                "StandardFirmata is uploaded to your Arduino and you have "
+                "specified the correct port.", e
+            )
             self.board = None
-            self.it = None
+            self._iterator = None
             raise SerialConnectionError(str(e))
             
-    def _ensure_pin_mode(self, pin_num, mode):
-        """Set pin mode if not already set to desired mode."""
-        if not self.board:
-            print("Error: Not connected to Arduino.")
-            return None
+    def _tune_serial(self, low_latency, read_timeout):
+        """Apply low-latency settings to the board's serial port where supported."""
+        sp = getattr(self.board, 'sp', None)
+        if sp is None:
+            return
+        if read_timeout is not None:
+            sp.timeout = read_timeout
+        if low_latency:
+            try:
+                sp.set_low_latency_mode(True)
+            except (AttributeError, NotImplementedError, ValueError) as e:
+                # Older pyserial, non-Linux platform or driver without support
+                logger.debug("Low latency mode not available on %s: %s", self.port, e)
+            
+    @property
+    def it(self):
+        """The input iterator thread, or None when not connected."""
+        return self._iterator if self.board else None
             
+    def _pin_index(self, pin_num):
+        """Return ``pin_num`` as a plain int, or None if it is not a digital pin."""
         try:
-            pin = self.board.digital[pin_num]
+            index = operator.index(pin_num)
+        except TypeError:
+            return None  # Not an integer-like pin number
+        return index if 0 <= index < self._num_digital else None
+
+    def _get_digital(self, pin_num):
+        """Return the cached digital pin object, looking it up on first use.
+
+        Raises IndexError for pin numbers outside the board, including the
+        negative indices a plain list lookup would otherwise accept.
+        """
+        pin = self._digital_pins.get(pin_num)
+        if pin is None:
+            if self._pin_index(pin_num) is None:
+                raise IndexError(f"Invalid digital pin number {pin_num}")
+            pin = self._digital_pins[pin_num] = self.board.digital[pin_num]
+        return pin
+
+    def _get_analog(self, pin_num):
+        """Return the cached analog pin object, looking it up on first use."""
+        pin = self._analog_pins.get(pin_num)
+        if pin is None:
+            pin = self._analog_pins[pin_num] = self.board.analog[pin_num]
+        return pin
+
+    def _enable_analog(self, pin_num):
+        """Return the analog pin, enabling reporting on first use only.
+
+        Returns ``(pin, newly_enabled)`` so callers that do not poll can wait
+        for the first sample to arrive.
+        """
+        pin = self._get_analog(pin_num)
+        if pin_num in self._analog_enabled:
+            return pin, False
+        pin.enable_reporting()
+        self._analog_enabled.add(pin_num)
+        return pin, True
+
+    def _analog_read_failed(self, pin_num, error):
+        """Log a failed analog read and return None for the caller to pass on."""
+        if isinstance(error, IndexError):
+            logger.error("Invalid analog pin number A%s.", pin_num)
+        else:
+            logger.error("Error reading analog pin %s: %s", pin_num, error)
+        return None
+
+    @staticmethod
+    def _with_bit(mask, bit, value):
+        """Return ``mask`` with ``bit`` set to ``value`` (0 or 1)."""
+        return mask | (1 << bit) if value else mask & ~(1 << bit)
+
+    def _record_digital(self, pin_num, value):
+        """Remember the value last written to an output pin and its port bit."""
+        self._last_digital[pin_num] = value
+        port, bit = divmod(pin_num, 8)
+        self._port_state[port] = self._with_bit(self._port_state[port], bit, value)
+
+    def _forget_digital(self, pin_num):
+        """Drop the recorded output value of a pin that is no longer known."""
+        if self._last_digital.pop(pin_num, None) is not None:
+            port, bit = divmod(pin_num, 8)
+            self._port_state[port] &= ~(1 << bit)
+
+    def _raw_digital_port_write(self, port, mask):
+        """Send one Firmata digital message setting all output pins of a port."""
+        self.board.sp.write(bytes((_DIGITAL_MESSAGE | port, mask & 0x7F, (mask >> 7) & 0x7F)))
+
+    def _already_written(self, pin_num, value):
+        """Return True if the pin is an output last driven to ``value``."""
+        return (self._pin_modes.get(pin_num) == self._OUTPUT
+                and self._last_digital.get(pin_num) == value)
+
+    @_requires_board(default=(None, False))
+    def _ensure_pin_mode(self, pin_num, mode, settle=True):
+        """Set pin mode if not already set to desired mode.
+
+        Returns a ``(pin, changed)`` tuple so callers can skip settle delays
+        when the pin was already in the requested mode. ``pin`` is None on error.
+        Pass ``settle=False`` to leave the post-mode-change delay to the caller.
+        """
+        try:
+            pin = self._get_digital(pin_num)
             current_mode = self._pin_modes.get(pin_num)
             
             if current_mode != mode:
                 pin.mode = mode
                 self._pin_modes[pin_num] = mode
-                self.board.pass_time(0.01)  # Small delay after mode change
+                if mode != self._OUTPUT:
+                    self._forget_digital(pin_num)  # Firmata only drives OUTPUT pins
+                if settle:
+                    self.board.pass_time(0.01)  # Small delay after mode change
                 
-            return pin
+            return pin, current_mode != mode
             
         except Exception as e:
-            print(f"Error configuring pin {pin_num}: {str(e)}")
-            return None
+            logger.error("Error configuring pin %s: %s", pin_num, e)
+            return None, False
             
+    @_requires_board()
     def analog_read(self, pin_num):
         """Read from an analog input pin."""
-        if not self.board:
-            print("Error: Not connected to Arduino.")
-            return None
-            
         try:
-            pin = self.board.analog[pin_num]
-            pin.enable_reporting()
-            self.board.pass_time(0.05)  # Give time for first reading
+            pin, _ = self._enable_analog(pin_num)
             
-            # Sometimes first few readings are None, try a few times
-            for _ in range(5):
+            # First readings are None until the board reports; poll with
+            # exponential backoff (5 ms doubling, 50 ms per step, 250 ms total)
+            delay = 0.005
+            total = 0.0
+            while total < 0.25:
                 value = pin.read()
                 if value is not None:
                     return value
-                self.board.pass_time(0.05)
+                self.board.pass_time(delay)
+                total += delay
+                delay = min(delay * 2, 0.05)
                 
-            print(f"Warning: Could not get reading from analog pin {pin_num} after retries.")
+            logger.warning("Could not get reading from analog pin %s after retries.", pin_num)
             return None
             
-        except IndexError:
-            print(f"Error: Invalid analog pin number A{pin_num}.")
-            return None
         except Exception as e:
-            print(f"Error reading analog pin {pin_num}: {str(e)}")
-            return None
+            return self._analog_read_failed(pin_num, e)
             
+    @_requires_board()
+    def analog_read_nowait(self, pin_num):
+        """Return the latest reported sample from an analog pin without polling.
+
+        Reporting is enabled (and allowed to settle) on first use only; after
+        that this is just a read of the value kept up to date by the iterator.
+        May return None if the board has not reported a sample yet.
+        """
+        try:
+            pin, newly_enabled = self._enable_analog(pin_num)
+            if newly_enabled:
+                self.board.pass_time(0.05)  # No polling here, so wait for the first reading
+            return pin.read()
+            
+        except Exception as e:
+            return self._analog_read_failed(pin_num, e)
+            
+    @_requires_board()
     def analog_write(self, pin_num, value):
         """Write PWM value to a pin."""
-        if not self.board:
-            print("Error: Not connected to Arduino.")
-            return
-            
         if not 0 <= value <= 1:
-            print(f"Error: PWM value must be between 0.0 and 1.0, got {value}")
+            logger.error("PWM value must be between 0.0 and 1.0, got %s", value)
             return
             
         try:
-            pin = self._ensure_pin_mode(pin_num, PWM)
+            pin, _ = self._ensure_pin_mode(pin_num, self._PWM)
             if pin:
                 pin.write(value)
                 
         except Exception as e:
-            print(f"Error writing PWM to pin {pin_num}: {str(e)}")
+            logger.error("Error writing PWM to pin %s: %s", pin_num, e)
             
+    @_requires_board()
     def digital_read(self, pin_num):
         """Read from a digital input pin."""
-        if not self.board:
-            return None
-            
         try:
-            pin = self._ensure_pin_mode(pin_num, INPUT)
+            pin, changed = self._ensure_pin_mode(pin_num, self._INPUT)
             if pin:
-                self.board.pass_time(0.02)  # Give time for reading
+                if changed:
+                    self.board.pass_time(0.02)  # Give time for first reading
                 return pin.read()
                 
         except Exception as e:
-            print(f"Error reading digital pin {pin_num}: {str(e)}")
+            logger.error("Error reading digital pin %s: %s", pin_num, e)
             return None
             
+    @_requires_board()
     def digital_write(self, pin_num, value):
         """Write to a digital output pin."""
-        if not self.board:
-            print("Error: Not connected to Arduino.")
-            return None
-            
         if value not in [0, 1]:
-            print(f"Error: Digital value must be 0 (LOW) or 1 (HIGH), got {value}")
+            logger.error("Digital value must be 0 (LOW) or 1 (HIGH), got %s", value)
             return None
             
+        # Skip the serial frame if the pin already holds this value
+        if self._already_written(pin_num, value):
+            return value
+            
         try:
-            pin = self._ensure_pin_mode(pin_num, OUTPUT)
+            pin, _ = self._ensure_pin_mode(pin_num, self._OUTPUT)
             if pin:
                 pin.write(value)
-                if pin_num not in self.output_pins_configured:
-                    self.output_pins_configured.append(pin_num)
+                self._record_digital(pin_num, value)
+                self.output_pins_configured.add(pin_num)
                 return value
                 
         except Exception as e:
-            print(f"Error writing to digital pin {pin_num}: {str(e)}")
+            self._forget_digital(pin_num)
+            logger.error("Error writing to digital pin %s: %s", pin_num, e)
+            return None
+            
+    @_requires_board()
+    def digital_write_fast(self, pin_num, value):
+        """Write to a digital output pin with a single raw Firmata frame.
+
+        Only pins already in OUTPUT mode take the fast path: the new value is
+        merged into the cached port bitmask and sent straight to the serial
+        port, bypassing pyfirmata's per-pin dispatch. Anything else falls back
+        to :meth:`digital_write`.
+        """
+        if value not in [0, 1] or self._pin_modes.get(pin_num) != self._OUTPUT:
+            return self.digital_write(pin_num, value)
+        if self._last_digital.get(pin_num) == value:
+            return value
+            
+        try:
+            pin = self._get_digital(pin_num)
+            port, bit = divmod(pin_num, 8)
+            self._raw_digital_port_write(port, self._with_bit(self._port_state[port], bit, value))
+            
+        except Exception as e:
+            # Nothing is recorded until the frame is sent, so the port mask and
+            # pin.value still describe the last known state
+            self._last_digital.pop(pin_num, None)
+            logger.error("Error writing to digital pin %s: %s", pin_num, e)
             return None
             
+        pin.value = value  # Keep pyfirmata's own port mask in sync
+        self._record_digital(pin_num, value)
+        self.output_pins_configured.add(pin_num)
+        return value
+            
+    @_requires_board()
+    def digital_write_many(self, writes):
+        """Write several digital output pins in one batch.
+
+        :param writes: Mapping of pin number to value (0 or 1).
+        :return: Dict of the pins now holding the requested values, or None if
+                 not connected or the pins could not be configured. Pins
+                 already at their value are not rewritten.
+        """
+        valid = {}
+        written = {}
+        for pin_num, value in writes.items():
+            if value not in [0, 1]:
+                logger.error("Digital value must be 0 (LOW) or 1 (HIGH), got %s", value)
+            elif self._already_written(pin_num, value):
+                written[pin_num] = value
+            else:
+                valid[pin_num] = value
+                
+        # Switch every pin to OUTPUT first and settle once for the whole batch
+        pins = {}
+        any_changed = False
+        for pin_num in valid:
+            pin, changed = self._ensure_pin_mode(pin_num, self._OUTPUT, settle=False)
+            if pin:
+                pins[pin_num] = pin
+                any_changed = any_changed or changed
+        if any_changed:
+            try:
+                self.board.pass_time(0.01)
+            except Exception as e:
+                logger.error("Error configuring pins %s: %s", sorted(pins), e)
+                return None
+            
+        for pin_num, pin in pins.items():
+            try:
+                pin.write(valid[pin_num])
+                self._record_digital(pin_num, valid[pin_num])
+                written[pin_num] = valid[pin_num]
+            except Exception as e:
+                self._forget_digital(pin_num)
+                logger.error("Error writing to digital pin %s: %s", pin_num, e)
+                
+        self.output_pins_configured |= written.keys()
+        return written
+            
     def close(self):
-        """Close the connection and clean up."""
-        print("Closing Arduino connection...")
+        """Close the connection and clean up. Safe to call more than once."""
+        if self._closed:
+            return
+            
+        logger.info("Closing Arduino connection...")
         
         if not self.board:
-            print("No active Arduino connection to close.")
+            logger.info("No active Arduino connection to close.")
             return
             
-        # Set all configured output pins to safe state
-        for pin_num in self.output_pins_configured:
+        # Stop the input iterator first so it does not contend for the serial
+        # port while the safe-state frames go out. pyfirmata's Iterator has no
+        # stop(); it exits once its board reference is cleared.
+        if self._iterator is not None:
+            try:
+                self._iterator.board = None
+                self._iterator.join(timeout=0.1)
+            except Exception:
+                pass
+            
+        # Set all configured output pins to safe state, draining the set so
+        # nothing is re-sent if close() is entered again
+        pins_to_safe = self.output_pins_configured
+        self.output_pins_configured = set()
+        safe_pins = []
+        for pin_num in sorted(pins_to_safe):
             try:
-                pin = self.board.digital[pin_num]  # Get pin directly
-                pin.mode = OUTPUT  # Ensure OUTPUT mode
-                pin.write(self.safe_state)  # Set safe state
+                pin = self._get_digital(pin_num)
+                if self._pin_modes.get(pin_num) != self._OUTPUT:
+                    pin.mode = self._OUTPUT  # Ensure OUTPUT mode
+                    self._pin_modes[pin_num] = self._OUTPUT
+                safe_pins.append((pin_num, pin))
             except Exception as e:
-                print(f"Warning: Could not set pin {pin_num} to safe state on close: {str(e)}")
+                logger.warning("Could not set pin %s to safe state on close: %s", pin_num, e)
                 
-        # Close board (this also stops the iterator)
+        if getattr(self.board, 'sp', None) is not None:
+            # One digital message per 8-pin port instead of one per pin; the
+            # cached port mask keeps any other outputs on the port unchanged
+            masks = {}
+            for pin_num, _ in safe_pins:
+                port, bit = divmod(pin_num, 8)
+                mask = masks.get(port, self._port_state[port])
+                masks[port] = self._with_bit(mask, bit, self.safe_state)
+            for port in sorted(masks):
+                try:
+                    self._raw_digital_port_write(port, masks[port])
+                except Exception as e:
+                    logger.warning("Could not set port %s to safe state on close: %s", port, e)
+                    continue
+                # Only record the safe state once the frame has actually gone out
+                for pin_num, pin in safe_pins:
+                    if pin_num >> 3 == port:
+                        pin.value = self.safe_state
+                        self._record_digital(pin_num, self.safe_state)
+        else:
+            for pin_num, pin in safe_pins:
+                try:
+                    pin.write(self.safe_state)  # Set safe state
+                    self._record_digital(pin_num, self.safe_state)
+                except Exception as e:
+                    logger.warning("Could not set pin %s to safe state on close: %s", pin_num, e)
+                    
+        # Close board and serial port
         self.board.exit()
-        self.board = None
\ No newline at end of file
+        self.board = None
+        self._iterator = None  # Drop the thread and its reference to the board
+        self._closed = True
\ No newline at end of file
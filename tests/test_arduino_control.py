@@ -1,5 +1,9 @@
 """Test suite for ArduinoIO class."""
 
+import os
+import subprocess
+import sys
+
 import pytest
 from unittest.mock import patch, MagicMock, PropertyMock
 from pyfirmata import Arduino, util, OUTPUT, INPUT, PWM
@@ -11,14 +15,24 @@ DEFAULT_PINS = [8, 13]  # Common output pins
 INVALID_PIN = 99  # Pin number that doesn't exist
 
 class MockPin:
-    """Mock pin that properly tracks mode and other attributes."""
-    def __init__(self, pin_num):
+    """Lightweight pin that tracks mode and records its calls.
+
+    Plain attributes instead of MagicMock keep the suite fast. Set
+    ``read_values`` to queue successive read results (``read_value`` is
+    returned once the queue is empty) and ``write_error`` /
+    ``enable_reporting_error`` to make those calls raise.
+    """
+    def __init__(self, pin_num, read_value=1):
         self.pin_number = pin_num
         self._mode = None
         self._value = None
-        self.write = MagicMock(side_effect=self._write)
-        self.read = MagicMock(return_value=1)  # Default to HIGH for digital
-        self.enable_reporting = MagicMock()
+        self.read_value = read_value  # Default to HIGH for digital
+        self.read_values = []
+        self.write_error = None
+        self.enable_reporting_error = None
+        self.write_calls = []
+        self.read_calls = 0
+        self.enable_reporting_calls = 0
 
     @property
     def mode(self):
@@ -28,9 +42,23 @@ class MockPin:
     def mode(self, value):
         self._mode = value
 
-    def _write(self, value):
+    def write(self, value):
+        self.write_calls.append(value)
+        if self.write_error:
+            raise self.write_error
         self._value = value
 
+    def read(self):
+        self.read_calls += 1
+        if self.read_values:
+            return self.read_values.pop(0)
+        return self.read_value
+
+    def enable_reporting(self):
+        self.enable_reporting_calls += 1
+        if self.enable_reporting_error:
+            raise self.enable_reporting_error
+
 @pytest.fixture
 def mock_board():
     """Create a mock Arduino board with proper pin handling."""
@@ -48,12 +76,11 @@ def mock_board():
         if pin_num == INVALID_PIN:
             raise IndexError(f"Invalid analog pin A{pin_num}")
         if f'A{pin_num}' not in pins:
-            analog_pin = MockPin(pin_num)
-            analog_pin.read = MagicMock(return_value=0.5)  # Default to mid-range
-            pins[f'A{pin_num}'] = analog_pin
+            pins[f'A{pin_num}'] = MockPin(pin_num, read_value=0.5)  # Default to mid-range
         return pins[f'A{pin_num}']
 
     board.digital.__getitem__.side_effect = get_digital_pin
+    board.digital.__len__.return_value = 14  # Arduino Uno layout
     board.analog.__getitem__.side_effect = get_analog_pin
     board._pins = pins  # Store for test access
     return board
@@ -69,8 +96,8 @@ def mock_iterator():
 @pytest.fixture(autouse=True)
 def patch_dependencies(mock_board, mock_iterator):
     """Patch Arduino-related dependencies for all tests."""
-    with patch('src.arduino_control.Arduino', return_value=mock_board), \
-         patch('src.arduino_control.util.Iterator', return_value=mock_iterator):
+    with patch('pyfirmata.Arduino', return_value=mock_board), \
+         patch('pyfirmata.util.Iterator', return_value=mock_iterator):
         yield
 
 class TestArduinoIO:
@@ -88,16 +115,100 @@ class TestArduinoIO:
         for pin in DEFAULT_PINS:
             pin_obj = mock_board.digital[pin]
             assert pin_obj.mode == OUTPUT
-            pin_obj.write.assert_called_once_with(arduino.safe_state)
+            assert pin_obj.write_calls == [arduino.safe_state]
         
         assert sorted(arduino.output_pins_configured) == sorted(DEFAULT_PINS)
 
+    def test_init_single_settle_delay(self, mock_board):
+        """Test output pin setup pays one batched delay, not one per pin."""
+        pins = list(range(2, 12))
+        ArduinoIO(port=TEST_PORT, output_pins=pins)
+
+        delays = [c.args[0] for c in mock_board.pass_time.call_args_list]
+        assert delays == [0.05, max(0.02, 0.005 * len(pins))]
+
+    def test_init_output_pins_iterable(self, mock_board):
+        """Test output_pins may be any iterable, such as a map or generator."""
+        arduino = ArduinoIO(port=TEST_PORT, output_pins=map(int, ['8', '13']))
+        assert arduino.output_pins_configured == {8, 13}
+
+        arduino = ArduinoIO(port=TEST_PORT, output_pins=(p for p in DEFAULT_PINS))
+        assert arduino.output_pins_configured == set(DEFAULT_PINS)
+        assert mock_board.pass_time.call_args.args[0] == max(0.02, 0.005 * len(DEFAULT_PINS))
+
+    def test_init_invalid_pin(self, mock_board, caplog):
+        """Test out-of-range output pins are skipped without touching the board."""
+        arduino = ArduinoIO(port=TEST_PORT, output_pins=[8, INVALID_PIN])
+
+        assert arduino.output_pins_configured == {8}
+        assert f"Invalid pin number {INVALID_PIN} for this board." in caplog.text
+        requested = [c.args[0] for c in mock_board.digital.__getitem__.call_args_list]
+        assert INVALID_PIN not in requested
+        assert INVALID_PIN not in arduino._pin_modes
+        assert INVALID_PIN not in arduino._digital_pins
+
+    def test_init_integer_like_pins(self, mock_board, caplog):
+        """Test integer-like pin numbers are accepted and malformed ones rejected."""
+        class PinNumber:
+            """Stand-in for non-int integer types such as numpy.int64."""
+            def __init__(self, value):
+                self.value = value
+
+            def __index__(self):
+                return self.value
+
+            def __str__(self):
+                return str(self.value)
+
+        arduino = ArduinoIO(port=TEST_PORT, output_pins=[PinNumber(13), "x", [8]])
+
+        assert arduino.output_pins_configured == {13}
+        assert mock_board.digital[13].write_calls == [arduino.safe_state]
+        assert "Invalid pin number 13" not in caplog.text
+        assert "Invalid pin number x for this board." in caplog.text
+        assert "Invalid pin number [8] for this board." in caplog.text
+
+    def test_no_instance_dict(self):
+        """Test ArduinoIO uses slots and rejects unknown attributes."""
+        arduino = ArduinoIO(port=TEST_PORT)
+        assert not hasattr(arduino, '__dict__')
+        with pytest.raises(AttributeError):
+            arduino.unknown = 1
+
+    def test_init_tunes_serial_port(self, mock_board):
+        """Test the serial port is switched to low latency, timeout untouched."""
+        mock_board.sp.timeout = None  # As pyfirmata opens the port
+        ArduinoIO(port=TEST_PORT)
+        assert mock_board.sp.timeout is None
+        mock_board.sp.set_low_latency_mode.assert_called_once_with(True)
+
+    def test_init_serial_tuning_optional(self, mock_board):
+        """Test serial tuning can be disabled and tolerates unsupported ports."""
+        mock_board.sp.timeout = None
+        ArduinoIO(port=TEST_PORT, low_latency=False)
+        assert mock_board.sp.timeout is None
+        mock_board.sp.set_low_latency_mode.assert_not_called()
+
+        ArduinoIO(port=TEST_PORT, read_timeout=0.5)
+        assert mock_board.sp.timeout == 0.5
+
+        mock_board.sp.set_low_latency_mode.side_effect = NotImplementedError("unsupported")
+        arduino = ArduinoIO(port=TEST_PORT)
+        assert arduino.board == mock_board
+
     def test_init_connection_error(self):
         """Test initialization when connection fails."""
-        with patch('src.arduino_control.Arduino', side_effect=Exception("Connection failed")), \
+        with patch('pyfirmata.Arduino', side_effect=Exception("Connection failed")), \
              pytest.raises(SerialConnectionError):
             ArduinoIO(port=TEST_PORT)
 
+    def test_import_does_not_load_pyfirmata(self):
+        """Test pyfirmata is only imported when an ArduinoIO is created."""
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        code = "import sys, src.arduino_control; print('pyfirmata' in sys.modules)"
+        output = subprocess.check_output([sys.executable, "-c", code], cwd=root, text=True)
+        assert output.strip() == "False"
+
     def test_init_invalid_safe_state(self, mock_board):
         """Test initialization with invalid safe state."""
         arduino = ArduinoIO(port=TEST_PORT, safe_state=5)
@@ -108,22 +219,55 @@ class TestArduinoIO:
         arduino = ArduinoIO(port=TEST_PORT)
         expected_value = 0.75
         pin = mock_board.analog[0]
-        pin.read = MagicMock(return_value=expected_value)
+        pin.read_value = expected_value
         
         value = arduino.analog_read(0)
         assert value == expected_value
-        pin.enable_reporting.assert_called_once()
+        assert pin.enable_reporting_calls == 1
 
     def test_analog_read_retries(self, mock_board):
         """Test analog read with initial None values."""
         arduino = ArduinoIO(port=TEST_PORT)
         expected_value = 0.5
         pin = mock_board.analog[0]
-        pin.read = MagicMock(side_effect=[None, None, expected_value])
+        pin.read_values = [None, None, expected_value]
         
         value = arduino.analog_read(0)
         assert value == expected_value
-        assert pin.read.call_count == 3
+        assert pin.read_calls == 3
+
+    def test_analog_read_backoff(self, mock_board):
+        """Test analog read polls with exponential backoff."""
+        arduino = ArduinoIO(port=TEST_PORT)
+        pin = mock_board.analog[0]
+        pin.read_values = [None, None, None, None, 0.5]
+        mock_board.pass_time.reset_mock()
+
+        assert arduino.analog_read(0) == 0.5
+        delays = [c.args[0] for c in mock_board.pass_time.call_args_list]
+        assert delays == [0.005, 0.01, 0.02, 0.04]
+
+    def test_analog_read_nowait(self, mock_board):
+        """Test non-blocking analog read enables reporting only once."""
+        arduino = ArduinoIO(port=TEST_PORT)
+        pin = mock_board.analog[0]
+        mock_board.pass_time.reset_mock()
+
+        assert arduino.analog_read_nowait(0) == 0.5
+        mock_board.pass_time.assert_called_once_with(0.05)
+
+        mock_board.pass_time.reset_mock()
+        assert arduino.analog_read_nowait(0) == 0.5
+        assert arduino.analog_read(0) == 0.5
+        assert pin.enable_reporting_calls == 1
+        mock_board.pass_time.assert_not_called()
+
+    def test_analog_read_nowait_invalid_pin(self, mock_board, caplog):
+        """Test non-blocking analog read with invalid pin number."""
+        arduino = ArduinoIO(port=TEST_PORT)
+
+        assert arduino.analog_read_nowait(INVALID_PIN) is None
+        assert f"Invalid analog pin number A{INVALID_PIN}" in caplog.text
 
     def test_analog_write_success(self, mock_board):
         """Test successful PWM write."""
@@ -134,7 +278,7 @@ class TestArduinoIO:
         arduino.analog_write(test_pin, test_value)
         pin = mock_board.digital[test_pin]
         assert pin.mode == PWM
-        pin.write.assert_called_once_with(test_value)
+        assert pin.write_calls == [test_value]
 
     def test_analog_write_invalid_value(self, mock_board):
         """Test PWM write with invalid value."""
@@ -142,10 +286,10 @@ class TestArduinoIO:
         pin = mock_board.digital[9]
         
         arduino.analog_write(9, 1.5)  # Too high
-        pin.write.assert_not_called()
+        assert not pin.write_calls
         
         arduino.analog_write(9, -0.1)  # Too low
-        pin.write.assert_not_called()
+        assert not pin.write_calls
 
     def test_digital_read_success(self, mock_board):
         """Test successful digital read."""
@@ -153,7 +297,7 @@ class TestArduinoIO:
         pin_num = 2
         expected_value = 1
         pin = mock_board.digital[pin_num]
-        pin.read = MagicMock(return_value=expected_value)
+        pin.read_value = expected_value
         
         value = arduino.digital_read(pin_num)
         assert value == expected_value
@@ -168,14 +312,111 @@ class TestArduinoIO:
         result = arduino.digital_write(pin_num, 1)
         pin = mock_board.digital[pin_num]
         assert pin.mode == OUTPUT
-        pin.write.assert_called_with(1)
+        assert pin.write_calls[-1] == 1
         assert result == 1
         assert pin_num in arduino.output_pins_configured
 
         # Write LOW
         result = arduino.digital_write(pin_num, 0)
         assert result == 0
-        pin.write.assert_called_with(0)
+        assert pin.write_calls[-1] == 0
+
+    def test_digital_write_skips_unchanged_value(self, mock_board):
+        """Test repeated writes of the same value send nothing to the board."""
+        arduino = ArduinoIO(port=TEST_PORT, output_pins=[8], safe_state=0)
+        pin = mock_board.digital[8]
+        pin.write_calls.clear()
+
+        assert arduino.digital_write(8, 0) == 0  # Already at safe state
+        assert not pin.write_calls
+        arduino.digital_write(8, 1)
+        arduino.digital_write(8, 1)
+        assert pin.write_calls == [1]
+
+        # A mode change in between forces a real write again
+        arduino.digital_read(8)
+        arduino.digital_write(8, 1)
+        assert pin.mode == OUTPUT
+        assert len(pin.write_calls) == 2
+
+    def test_digital_write_fast(self, mock_board):
+        """Test fast writes send one raw port frame for configured outputs."""
+        arduino = ArduinoIO(port=TEST_PORT, output_pins=DEFAULT_PINS, safe_state=0)
+        mock_board.sp.write.reset_mock()
+
+        assert arduino.digital_write_fast(13, 1) == 1
+        mock_board.sp.write.assert_called_once_with(bytes((0x91, 0x20, 0x00)))
+        arduino.digital_write_fast(8, 1)
+        mock_board.sp.write.assert_called_with(bytes((0x91, 0x21, 0x00)))
+        assert mock_board.digital[8].value == 1
+        assert mock_board.digital[8].write_calls == [0]  # Only the safe state
+
+        # A pin leaving OUTPUT mode drops out of the port mask
+        arduino.digital_read(13)
+        arduino.digital_write_fast(8, 0)
+        mock_board.sp.write.assert_called_with(bytes((0x91, 0x00, 0x00)))
+
+    def test_digital_write_fast_registers_pin_for_close(self, mock_board):
+        """Test a fast write adds the pin to the set restored on close."""
+        arduino = ArduinoIO(port=TEST_PORT, safe_state=0)
+        pin = mock_board.digital[7]
+        pin.write_error = Exception("Write failed")
+        arduino.digital_write(7, 1)  # Leaves pin 7 in OUTPUT mode, unconfigured
+        pin.write_error = None
+
+        assert arduino.digital_write_fast(7, 1) == 1
+        assert arduino.output_pins_configured == {7}
+
+        mock_board.sp.write.reset_mock()
+        arduino.close()
+        mock_board.sp.write.assert_called_once_with(bytes((0x90, 0x00, 0x00)))
+        assert pin.value == 0
+
+    def test_digital_write_fast_serial_failure(self, mock_board, caplog):
+        """Test a failed raw frame leaves the cached pin state untouched."""
+        arduino = ArduinoIO(port=TEST_PORT, output_pins=[8], safe_state=0)
+        pin = mock_board.digital[8]
+        pin.value = 0  # As pyfirmata's Pin.write leaves it
+        mock_board.sp.write.side_effect = Exception("Port gone")
+
+        assert arduino.digital_write_fast(8, 1) is None
+        assert "Error writing to digital pin 8: Port gone" in caplog.text
+        assert pin.value == 0
+        assert arduino._port_state == [0, 0]
+
+        # The retry goes out rather than being skipped as already written
+        mock_board.sp.write.side_effect = None
+        mock_board.sp.write.reset_mock()
+        assert arduino.digital_write_fast(8, 1) == 1
+        mock_board.sp.write.assert_called_once_with(bytes((0x91, 0x01, 0x00)))
+
+    def test_write_paths_reject_out_of_range_pins(self, mock_board, caplog):
+        """Test negative or too-large pins never reach the board or port masks."""
+        arduino = ArduinoIO(port=TEST_PORT, output_pins=[13])
+        mock_board.sp.write.reset_mock()
+
+        assert arduino.digital_write(-1, 1) is None
+        assert arduino.digital_write_fast(-1, 1) is None
+        assert arduino.digital_write_many({-1: 1, 14: 1}) == {}
+        assert "Invalid digital pin number -1" in caplog.text
+        assert "Invalid digital pin number 14" in caplog.text
+        requested = [c.args[0] for c in mock_board.digital.__getitem__.call_args_list]
+        assert -1 not in requested and 14 not in requested
+        assert arduino.output_pins_configured == {13}
+        assert arduino._port_state == [0, 0x20]
+
+        arduino.close()
+        mock_board.sp.write.assert_called_once_with(bytes((0x91, 0x20, 0x00)))
+
+    def test_digital_write_fast_fallback(self, mock_board):
+        """Test fast writes to unconfigured pins use the regular path."""
+        arduino = ArduinoIO(port=TEST_PORT)
+        mock_board.sp.write.reset_mock()
+
+        assert arduino.digital_write_fast(7, 1) == 1
+        assert mock_board.digital[7].write_calls == [1]
+        assert mock_board.digital[7].mode == OUTPUT
+        mock_board.sp.write.assert_not_called()
 
     def test_digital_write_invalid_value(self, mock_board):
         """Test digital write with invalid value."""
@@ -184,7 +425,37 @@ class TestArduinoIO:
         
         result = arduino.digital_write(7, 2)  # Invalid value
         assert result is None
-        pin.write.assert_not_called()
+        assert not pin.write_calls
+
+    def test_digital_write_many(self, mock_board):
+        """Test batched digital writes settle once and skip invalid values."""
+        arduino = ArduinoIO(port=TEST_PORT)
+        mock_board.pass_time.reset_mock()
+
+        result = arduino.digital_write_many({4: 1, 5: 0, 6: 2})
+        assert result == {4: 1, 5: 0}
+        mock_board.pass_time.assert_called_once_with(0.01)
+        for pin_num, value in result.items():
+            pin = mock_board.digital[pin_num]
+            assert pin.mode == OUTPUT
+            assert pin.write_calls == [value]
+        assert not mock_board.digital[6].write_calls
+        assert sorted(arduino.output_pins_configured) == [4, 5]
+
+        # Pins already in OUTPUT mode need no settle delay
+        mock_board.pass_time.reset_mock()
+        arduino.digital_write_many({4: 0, 5: 1})
+        mock_board.pass_time.assert_not_called()
+
+    def test_digital_write_many_settle_failure(self, mock_board, caplog):
+        """Test a failing batch settle delay is logged instead of raised."""
+        arduino = ArduinoIO(port=TEST_PORT)
+        mock_board.pass_time.side_effect = Exception("Timing error")
+
+        assert arduino.digital_write_many({4: 1, 5: 0}) is None
+        assert "Error configuring pins [4, 5]: Timing error" in caplog.text
+        assert not mock_board.digital[4].write_calls
+        assert not arduino.output_pins_configured
 
     def test_ensure_pin_mode(self, mock_board):
         """Test internal pin mode management."""
@@ -192,34 +463,129 @@ class TestArduinoIO:
         pin_num = 5
         
         # First set to OUTPUT
-        pin = arduino._ensure_pin_mode(pin_num, OUTPUT)
+        pin, changed = arduino._ensure_pin_mode(pin_num, OUTPUT)
         assert pin.mode == OUTPUT
+        assert changed
         assert arduino._pin_modes[pin_num] == OUTPUT
         
         # Set to same mode - should not trigger mode change
         mock_board.pass_time.reset_mock()
-        arduino._ensure_pin_mode(pin_num, OUTPUT)
+        _, changed = arduino._ensure_pin_mode(pin_num, OUTPUT)
+        assert not changed
         mock_board.pass_time.assert_not_called()
         
         # Change to INPUT
-        pin = arduino._ensure_pin_mode(pin_num, INPUT)
+        pin, changed = arduino._ensure_pin_mode(pin_num, INPUT)
         assert pin.mode == INPUT
+        assert changed
         assert arduino._pin_modes[pin_num] == INPUT
 
+    def test_pin_objects_cached(self, mock_board):
+        """Test pin objects are looked up on the board only once."""
+        arduino = ArduinoIO(port=TEST_PORT)
+        arduino.digital_write(7, 1)
+        arduino.digital_write(7, 0)
+        arduino.analog_read(0)
+        arduino.analog_read(0)
+
+        assert mock_board.digital.__getitem__.call_count == 1
+        assert mock_board.analog.__getitem__.call_count == 1
+
+    def test_digital_read_skips_delay_when_mode_unchanged(self, mock_board):
+        """Test repeated digital reads only wait after the mode change."""
+        arduino = ArduinoIO(port=TEST_PORT)
+        arduino.digital_read(2)
+
+        mock_board.pass_time.reset_mock()
+        assert arduino.digital_read(2) == 1
+        mock_board.pass_time.assert_not_called()
+
     def test_close(self, mock_board):
         """Test closing the connection."""
         arduino = ArduinoIO(port=TEST_PORT, output_pins=DEFAULT_PINS)
         arduino.digital_write(7, 1)  # Add another output pin
+        mock_board.sp.write.reset_mock()
         
         arduino.close()
         
-        # Check all output pins were set to safe state
+        # Check all output pins were set to safe state, one frame per port
         for pin_num in DEFAULT_PINS + [7]:
-            pin = mock_board.digital[pin_num]
-            pin.write.assert_called_with(arduino.safe_state)
+            assert mock_board.digital[pin_num].value == arduino.safe_state
+        frames = [c.args[0] for c in mock_board.sp.write.call_args_list]
+        assert frames == [bytes((0x90, 0x00, 0x01)), bytes((0x91, 0x21, 0x00))]
         
         mock_board.exit.assert_called_once()
         assert arduino.board is None
+        assert arduino.it is None
+
+    def test_close_per_pin_fallback(self, mock_board):
+        """Test close writes pins one by one when the serial port is not exposed."""
+        del mock_board.sp
+        arduino = ArduinoIO(port=TEST_PORT, output_pins=DEFAULT_PINS, safe_state=0)
+        arduino.digital_write(8, 1)
+
+        arduino.close()
+        for pin_num in DEFAULT_PINS:
+            assert mock_board.digital[pin_num].write_calls[-1] == 0
+        mock_board.exit.assert_called_once()
+
+    def test_close_port_write_failure(self, mock_board, caplog):
+        """Test a failed port frame on close does not mark its pins as safe."""
+        arduino = ArduinoIO(port=TEST_PORT, output_pins=[13], safe_state=1)
+        arduino.digital_write(7, 0)
+        pin7, pin13 = mock_board.digital[7], mock_board.digital[13]
+        pin7.value = 0  # As pyfirmata's Pin.write leaves it
+        pin13.value = 1
+
+        def write(frame):
+            if frame[0] == 0x90:
+                raise Exception("Port gone")
+        mock_board.sp.write.side_effect = write
+
+        arduino.close()
+        assert "Could not set port 0 to safe state on close: Port gone" in caplog.text
+        assert pin7.value == 0
+        assert arduino._last_digital[7] == 0
+        assert pin13.value == 1
+        mock_board.sp.write.assert_called_with(bytes((0x91, 0x20, 0x00)))
+
+    def test_close_stops_iterator_first(self, mock_board, mock_iterator):
+        """Test close stops the iterator thread before the safe-state writes."""
+        arduino = ArduinoIO(port=TEST_PORT, output_pins=[8])
+        mock_board.sp.write.reset_mock()
+
+        def joined(timeout=None):
+            assert mock_iterator.board is None
+            mock_board.sp.write.assert_not_called()
+        mock_iterator.join.side_effect = joined
+
+        arduino.close()
+        mock_iterator.join.assert_called_once_with(timeout=0.1)
+        mock_board.sp.write.assert_called_once()
+
+    def test_close_twice(self, mock_board):
+        """Test a second close is a no-op."""
+        arduino = ArduinoIO(port=TEST_PORT, output_pins=DEFAULT_PINS)
+        arduino.close()
+        frame_count = mock_board.sp.write.call_count
+
+        arduino.close()
+        assert mock_board.sp.write.call_count == frame_count
+        mock_board.exit.assert_called_once()
+        assert not arduino.output_pins_configured
+
+    def test_close_skips_redundant_mode_change(self, mock_board):
+        """Test close only resends OUTPUT mode for pins not known to be OUTPUT."""
+        arduino = ArduinoIO(port=TEST_PORT, output_pins=[8])
+        arduino.digital_read(2)
+        arduino.output_pins_configured.add(2)
+        mock_board.digital[8]._mode = None  # Would be restored if close resent it
+
+        arduino.close()
+
+        assert mock_board.digital[8].mode is None
+        assert mock_board.digital[2].mode == OUTPUT
+        assert mock_board.digital[8].value == arduino.safe_state
 
     def test_close_no_board(self):
         """Test close when no board is connected."""
@@ -227,58 +593,67 @@ class TestArduinoIO:
         arduino.board = None
         arduino.close()  # Should not raise any errors
 
-    def test_init_multiple_pin_failures(self, mock_board, capsys):
+    def test_io_without_board(self, caplog):
+        """Test I/O methods report and return defaults when not connected."""
+        arduino = ArduinoIO(port=TEST_PORT)
+        arduino.board = None
+
+        assert arduino.analog_read(0) is None
+        assert arduino.digital_read(2) is None
+        assert arduino.digital_write(7, 1) is None
+        assert arduino.digital_write_many({7: 1}) is None
+        assert arduino._ensure_pin_mode(7, OUTPUT) == (None, False)
+        arduino.analog_write(9, 0.5)
+        assert caplog.text.count("Not connected to Arduino.") == 6
+
+    def test_init_multiple_pin_failures(self, mock_board, caplog):
         """Test initialization when multiple pins fail to configure."""
         def pin_error(pin_num):
             pin = MockPin(pin_num)
             if pin_num in [8, 13]:
-                pin.write.side_effect = Exception(f"Error on pin {pin_num}")
+                pin.write_error = Exception(f"Error on pin {pin_num}")
             return pin
         
         mock_board.digital.__getitem__.side_effect = pin_error
         
         arduino = ArduinoIO(port=TEST_PORT, output_pins=[8, 13])
         
-        captured = capsys.readouterr()
-        assert "Warning: Could not configure pin 8:" in captured.out
-        assert "Warning: Could not configure pin 13:" in captured.out
+        assert "Could not configure pin 8:" in caplog.text
+        assert "Could not configure pin 13:" in caplog.text
         assert not arduino.output_pins_configured  # No pins should be configured
 
-    def test_analog_read_invalid_pin(self, mock_board, capsys):
+    def test_analog_read_invalid_pin(self, mock_board, caplog):
         """Test analog read with invalid pin number."""
         arduino = ArduinoIO(port=TEST_PORT)
         
         # Test invalid pin
         value = arduino.analog_read(INVALID_PIN)
         assert value is None
-        captured = capsys.readouterr()
-        assert f"Error: Invalid analog pin number A{INVALID_PIN}" in captured.out
+        assert f"Invalid analog pin number A{INVALID_PIN}" in caplog.text
 
-    def test_analog_read_enable_reporting_failure(self, mock_board, capsys):
+    def test_analog_read_enable_reporting_failure(self, mock_board, caplog):
         """Test analog read when enable_reporting fails."""
         arduino = ArduinoIO(port=TEST_PORT)
         pin = mock_board.analog[0]
-        pin.enable_reporting.side_effect = Exception("Failed to enable reporting")
+        pin.enable_reporting_error = Exception("Failed to enable reporting")
         
         value = arduino.analog_read(0)
         assert value is None
-        captured = capsys.readouterr()
-        assert "Error reading analog pin" in captured.out
-        assert "Failed to enable reporting" in captured.out
+        assert "Error reading analog pin" in caplog.text
+        assert "Failed to enable reporting" in caplog.text
 
-    def test_analog_read_persistent_none(self, mock_board, capsys):
+    def test_analog_read_persistent_none(self, mock_board, caplog):
         """Test analog read when values are persistently None."""
         arduino = ArduinoIO(port=TEST_PORT)
         pin = mock_board.analog[0]
-        pin.read = MagicMock(return_value=None)  # Always return None
+        pin.read_value = None  # Always return None
         
         value = arduino.analog_read(0)
         assert value is None
-        captured = capsys.readouterr()
-        assert "Warning: Could not get reading from analog pin 0 after retries" in captured.out
-        assert pin.read.call_count >= 5  # Should try at least 5 times
+        assert "Could not get reading from analog pin 0 after retries" in caplog.text
+        assert pin.read_calls >= 5  # Should try at least 5 times
 
-    def test_ensure_pin_mode_error(self, mock_board, capsys):
+    def test_ensure_pin_mode_error(self, mock_board, caplog):
         """Test error handling in _ensure_pin_mode."""
         arduino = ArduinoIO(port=TEST_PORT)
         pin_num = 5
@@ -297,12 +672,12 @@ class TestArduinoIO:
         error_pin = ErrorMockPin(pin_num)
         mock_board.digital.__getitem__ = MagicMock(return_value=error_pin)
         
-        result = arduino._ensure_pin_mode(pin_num, OUTPUT)
+        result, changed = arduino._ensure_pin_mode(pin_num, OUTPUT)
         assert result is None
-        captured = capsys.readouterr()
-        assert f"Error configuring pin {pin_num}: Mode set failed" in captured.out
+        assert not changed
+        assert f"Error configuring pin {pin_num}: Mode set failed" in caplog.text
 
-    def test_board_timing_issues(self, mock_board, capsys):
+    def test_board_timing_issues(self, mock_board, caplog):
         """Test handling of board timing issues."""
         arduino = ArduinoIO(port=TEST_PORT)
         mock_board.pass_time.side_effect = Exception("Timing error")
@@ -310,61 +685,58 @@ class TestArduinoIO:
         # Try digital read which uses pass_time
         value = arduino.digital_read(2)
         assert value is None
-        captured = capsys.readouterr()
-        assert f"Error configuring pin 2: Timing error" in captured.out
+        assert f"Error configuring pin 2: Timing error" in caplog.text
 
-    def test_write_failures(self, mock_board, capsys):
+    def test_write_failures(self, mock_board, caplog):
         """Test handling of write failures."""
         arduino = ArduinoIO(port=TEST_PORT)
         pin_num = 7
         pin = MockPin(pin_num)
-        pin.write = MagicMock(side_effect=Exception("Write failed"))
+        pin.write_error = Exception("Write failed")
         mock_board.digital.__getitem__ = MagicMock(return_value=pin)
         
         # Test digital write
         result = arduino.digital_write(pin_num, 1)
         assert result is None
-        captured = capsys.readouterr()
-        assert "Error writing to digital pin 7: Write failed" in captured.out
+        assert "Error writing to digital pin 7: Write failed" in caplog.text
         
         # Clear captured output and test analog write
+        caplog.clear()
         pin.mode = PWM
         arduino._pin_modes[pin_num] = PWM
         arduino.analog_write(pin_num, 0.5)
-        captured = capsys.readouterr()
-        assert "Error writing PWM to pin 7: Write failed" in captured.out
+        assert "Error writing PWM to pin 7: Write failed" in caplog.text
 
-    def test_close_with_mixed_failures(self, mock_board, capsys):
+    def test_close_with_mixed_failures(self, mock_board, caplog):
         """Test close when some pins fail but others succeed."""
         # Create pins with specific behaviors
         pin8 = MockPin(8)
         pin13 = MockPin(13)
-        pin13.write = MagicMock(side_effect=Exception("Close error"))
+        pin13.write_error = Exception("Close error")
         
         pins = {8: pin8, 13: pin13}
         def get_pin(pin_num):
             return pins[pin_num]
         mock_board.digital.__getitem__.side_effect = get_pin
+        del mock_board.sp  # Per-pin path, where each write can fail on its own
         
         # Initialize Arduino with both pins
         arduino = ArduinoIO(port=TEST_PORT)
-        arduino.output_pins_configured = [8, 13]  # Add pins to configured list
+        arduino.output_pins_configured = {8, 13}  # Add pins to configured set
         
         arduino.close()
         
-        captured = capsys.readouterr()
-        assert "Warning: Could not set pin 13 to safe state on close: Close error" in captured.out
-        assert pin8.write.called  # Should have tried to write to pin 8
+        assert "Could not set pin 13 to safe state on close: Close error" in caplog.text
+        assert pin8.write_calls  # Should have tried to write to pin 8
         mock_board.exit.assert_called_once()
 
-    def test_analog_write_pin_type_error(self, mock_board, capsys):
+    def test_analog_write_pin_type_error(self, mock_board, caplog):
         """Test analog write to non-PWM pin."""
         arduino = ArduinoIO(port=TEST_PORT)
         pin_num = 7
         pin = MockPin(pin_num)
-        pin.write = MagicMock(side_effect=TypeError("Pin does not support PWM"))
+        pin.write_error = TypeError("Pin does not support PWM")
         mock_board.digital.__getitem__ = MagicMock(return_value=pin)
         
         arduino.analog_write(pin_num, 0.5)
-        captured = capsys.readouterr()
-        assert f"Error writing PWM to pin {pin_num}: Pin does not support PWM" in captured.out
+        assert f"Error writing PWM to pin {pin_num}: Pin does not support PWM" in caplog.text